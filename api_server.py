@@ -3,15 +3,30 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import inspect
+import os
+import queue
+import selectors
+import struct
 import threading
 import time
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import termios
+except ImportError:  # Windows
+    termios = None
 
 import serial
 from serial.tools import list_ports
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
-from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS
+from dynamixel_sdk import PortHandler, PacketHandler, GroupSyncWrite, COMM_SUCCESS
 
 app = FastAPI(title="Pipette Control API")
 
@@ -21,27 +36,144 @@ DXL_BAUD_DEFAULT = 1_000_000
 DXL_ID_DEFAULT = 1
 
 ADDR_TORQUE_ENABLE = 64
+ADDR_STATUS_RETURN_LEVEL = 68
 ADDR_OPERATING_MODE = 11
 ADDR_PROFILE_ACCELERATION = 108
 ADDR_PROFILE_VELOCITY = 112
 ADDR_GOAL_POSITION = 116
+ADDR_MOVING = 122
 ADDR_PRESENT_POSITION = 132
+ADDR_INDIRECT_ADDRESS_1 = 168
+ADDR_INDIRECT_DATA_1 = 224
+
+# Registers aliased into Indirect Data 1..13 so a move is a single write:
+# torque enable, then profile acceleration/velocity and goal (108..119).
+MOVE_BLOCK_ADDRS = [ADDR_TORQUE_ENABLE] + list(range(ADDR_PROFILE_ACCELERATION, ADDR_GOAL_POSITION + 4))
 
 TICKS_PER_REV = 4096
 DEGREES_PER_REV = 360.0
+_TICK_MASK = TICKS_PER_REV - 1  # TICKS_PER_REV is a power of two
+_DEG_PER_TICK = DEGREES_PER_REV / TICKS_PER_REV
 
 # --- Printer defaults ---
 PRINTER_PORT_DEFAULT = "/dev/ttyUSB0"
 PRINTER_BAUD_DEFAULT = 115200
 
-printer_lock = threading.Lock()
-servo_lock = threading.Lock()
+PRINTER_WRITE_TIMEOUT_S = 5.0
+# The printer reader thread wakes at least this often, so a closed port is
+# noticed promptly.
+PRINTER_READ_POLL_S = 0.1
+
+# Each device gets a single worker thread: its blocking serial I/O runs there,
+# one operation at a time, without tying up the event loop or the other
+# device. For the printer this opens the port and waits for drains; each
+# printer also has a reader and a writer thread.
+printer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="printer")
+servo_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="servo")
+
+
+class DeviceWorker:
+    """Runs one device's operations one at a time, in submission order.
+
+    Callers enqueue an op and await its result while a single background
+    task drains the queue. A caller that gives up (timeout, disconnect)
+    before its op starts is skipped; once started, an op always runs to
+    completion so the device is never left half-way through a command.
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        self.executor = executor
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, fn, *args):
+        """Run fn(*args) on this device: coroutine functions are awaited on
+        the event loop, plain functions run on the executor."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (e.g. TestClient runs one per
+            # request): a queue and task from another loop would never run.
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        fut = loop.create_future()
+        await self._queue.put((fn, args, fut))
+        return await fut
+
+    async def _run(self, jobs: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, args, fut = await jobs.get()
+            if fut.cancelled():
+                continue
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args)
+                else:
+                    result = await loop.run_in_executor(self.executor, fn, *args)
+            except Exception as exc:
+                if not fut.done():
+                    fut.set_exception(exc)
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+
+
+servo_worker = DeviceWorker(servo_pool)
+
+
+class DxlConn:
+    """An open Dynamixel port plus its packet handler, reused across requests."""
+
+    def __init__(self, port: PortHandler, packet: PacketHandler, baud: int):
+        self.port = port
+        self.packet = packet
+        self.baud = baud
+        # IDs already switched to Status Return Level 1 (no replies to writes).
+        self.quiet_ids: set = set()
+        # Per ID: last [acceleration, velocity] if the indirect move block is
+        # mapped, None if it couldn't be (torque was on), absent if untried.
+        self.move_blocks: Dict[int, Optional[List[int]]] = {}
+        # Per ID: (present position, monotonic time, goal) from the last read
+        # after a move to goal had stopped. Absent while torque is off or the
+        # servo may still be moving.
+        self.last_pos: Dict[int, Tuple[int, float, int]] = {}
+        # Per ID: bumped whenever last_pos is dropped. A move's polls only
+        # cache positions while the generation they started with is current,
+        # so a torque-off queued between polls isn't undone by the next one.
+        self.pos_gen: Dict[int, int] = {}
+
+    def forget_pos(self, dxl_id: int) -> int:
+        """Drop the cached position for dxl_id; returns the new generation."""
+        self.last_pos.pop(dxl_id, None)
+        gen = self.pos_gen[dxl_id] = self.pos_gen.get(dxl_id, 0) + 1
+        return gen
+
+
+# Opening a USB-CDC port resets the TTY and costs far more than a bus
+# transaction, so keep one connection per device for the server's lifetime.
+_dxl_conns: Dict[str, DxlConn] = {}
+_printer_clients: Dict[str, "AsyncPrinterClient"] = {}
+
+# A cached position younger than this lets servo_move skip a no-op move.
+LAST_POS_MAX_AGE_S = 0.1
+
+# Marlin replies that end the wait for a command.
+_ACK_PREFIXES = (b"ok", b"error")
+_RESEND_PREFIXES = (b"resend", b"rs")
+
+# G-code lines sent ahead of their "ok". Marlin's planner absorbs them, but
+# its serial receive buffer is only 128 bytes by default, so unacknowledged
+# bytes are capped as well.
+MAX_INFLIGHT = 8
+PRINTER_RX_BUFFER_BYTES = 127
 
 
 # ----- Helper functions -----
 
 def ticks_to_deg(ticks: int) -> float:
-    return (ticks % TICKS_PER_REV) * (DEGREES_PER_REV / TICKS_PER_REV)
+    return (ticks & _TICK_MASK) * _DEG_PER_TICK
 
 
 def dxl_write_1(packet, port, dxl_id, addr, value):
@@ -53,13 +185,23 @@ def dxl_write_1(packet, port, dxl_id, addr, value):
     return comm, err
 
 
-def dxl_write_4(packet, port, dxl_id, addr, value):
-    res = packet.write4ByteTxRx(port, dxl_id, addr, value)
-    if len(res) == 2:
-        comm, err = res
-    else:
-        _, comm, err = res
-    return comm, err
+# Sync writes never get a status packet, whatever the servo's Status Return
+# Level, so a read straight after one can't pick up a stray write reply (as
+# it could after a power-cycled servo falls back to level 2).
+def dxl_sync_write_1(packet, port, ids, addr, value):
+    gsw = GroupSyncWrite(port, packet, addr, 1)
+    for dxl_id in ids:
+        gsw.addParam(dxl_id, [value & 0xFF])
+    return gsw.txPacket()
+
+
+def dxl_sync_write_4(packet, port, ids, addr, values):
+    # Consecutive 4-byte registers from addr, same values for every ID, one packet.
+    data = list(struct.pack(f"<{len(values)}I", *(v & 0xFFFFFFFF for v in values)))
+    gsw = GroupSyncWrite(port, packet, addr, len(data))
+    for dxl_id in ids:
+        gsw.addParam(dxl_id, data)
+    return gsw.txPacket()
 
 
 def dxl_read_1(packet, port, dxl_id, addr):
@@ -72,48 +214,413 @@ def dxl_read_4(packet, port, dxl_id, addr):
     return val, comm, err
 
 
-def _open_printer(port: str, baud: int, timeout_s: float) -> serial.Serial:
+def dxl_read_moving(packet, port, dxl_id):
+    # Moving (122) through Present Position (132..135) in one read.
+    data, comm, err = packet.readTxRx(port, dxl_id, ADDR_MOVING, ADDR_PRESENT_POSITION + 4 - ADDR_MOVING)
+    if comm != COMM_SUCCESS:
+        return None, None, comm, err
+    pos = struct.unpack_from("<I", bytes(data), ADDR_PRESENT_POSITION - ADDR_MOVING)[0]
+    return data[0], pos, comm, err
+
+
+def _set_low_latency(ser: serial.Serial) -> None:
+    # USB-serial adapters (FTDI especially) hold received bytes for up to 16 ms
+    # by default; ASYNC_LOW_LATENCY turns that off. pyserial only implements
+    # this on Linux, and not every driver accepts it, so it's best effort.
+    set_low_latency_mode = getattr(ser, "set_low_latency_mode", None)
+    if set_low_latency_mode is None:
+        return
+    try:
+        set_low_latency_mode(True)
+    except (OSError, ValueError):
+        pass
+
+
+def _tune_dxl_port(ser: serial.Serial) -> None:
+    # The SDK's PortHandler opens a plain pyserial port. Make sure the TTY has
+    # no line-discipline processing left on and reads return immediately, and
+    # skip the USB latency timer.
+    _set_low_latency(ser)
+    if hasattr(ser, "set_buffer_size"):
+        ser.set_buffer_size(rx_size=64 * 1024)
+    if termios is None:
+        return
+    try:
+        fd = ser.fileno()
+        attrs = termios.tcgetattr(fd)
+        attrs[3] &= ~(termios.ICANON | termios.ECHO | termios.ISIG | termios.IEXTEN)
+        attrs[6][termios.VMIN] = 0
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    except (OSError, termios.error):
+        pass
+
+
+def get_conn(dev: str, baud: int) -> DxlConn:
+    # Only called from servo_pool, which serializes access to the cache.
+    conn = _dxl_conns.get(dev)
+    if conn is None:
+        port = PortHandler(dev)
+        if not port.openPort():
+            raise HTTPException(status_code=500, detail=f"Failed to open {dev}")
+        if not port.setBaudRate(baud):
+            port.closePort()
+            raise HTTPException(status_code=500, detail=f"Failed to set baud {baud}")
+        # setBaudRate reopens port.ser, so tune the fd afterwards.
+        _tune_dxl_port(port.ser)
+        conn = DxlConn(port, PacketHandler(2.0), baud)
+        _dxl_conns[dev] = conn
+        atexit.register(port.closePort)
+    elif conn.baud != baud:
+        if not conn.port.setBaudRate(baud):
+            raise HTTPException(status_code=500, detail=f"Failed to set baud {baud}")
+        _tune_dxl_port(conn.port.ser)
+        conn.baud = baud
+    return conn
+
+
+@contextmanager
+def servo_session(dev: str, baud: int, dxl_id: int):
+    """Yield the DxlConn for one request; runs on servo_pool."""
+    conn = get_conn(dev, baud)
+    if dxl_id not in conn.quiet_ids:
+        # Reply to reads and pings only. The reply to this write may or may
+        # not arrive depending on firmware, so its result is ignored.
+        dxl_write_1(conn.packet, conn.port, dxl_id, ADDR_STATUS_RETURN_LEVEL, 1)
+        conn.quiet_ids.add(dxl_id)
     try:
+        yield conn
+    except Exception:
+        # A power-cycled servo is back to replying to every write and may have
+        # lost its indirect mapping; set both up again on next use.
+        conn.quiet_ids.discard(dxl_id)
+        conn.move_blocks.pop(dxl_id, None)
+        conn.forget_pos(dxl_id)
+        raise
+
+
+def _map_move_block(packet, port, dxl_id) -> Optional[List[int]]:
+    """Point Indirect Data 1..13 at MOVE_BLOCK_ADDRS.
+
+    Returns the servo's current [acceleration, velocity], or None if the
+    mapping isn't in place; the servo only accepts it with torque off.
+    """
+    want = list(struct.pack(f"<{len(MOVE_BLOCK_ADDRS)}H", *MOVE_BLOCK_ADDRS))
+    data, comm, _ = packet.readTxRx(port, dxl_id, ADDR_INDIRECT_ADDRESS_1, len(want))
+    if comm != COMM_SUCCESS:
+        return None
+    if list(data) != want:
+        gsw = GroupSyncWrite(port, packet, ADDR_INDIRECT_ADDRESS_1, len(want))
+        gsw.addParam(dxl_id, want)
+        gsw.txPacket()
+        data, comm, _ = packet.readTxRx(port, dxl_id, ADDR_INDIRECT_ADDRESS_1, len(want))
+        if comm != COMM_SUCCESS or list(data) != want:
+            return None
+    data, comm, _ = packet.readTxRx(port, dxl_id, ADDR_PROFILE_ACCELERATION, 8)
+    if comm != COMM_SUCCESS:
+        return None
+    return list(struct.unpack("<II", bytes(data)))
+
+
+def _numbered_line(n: int, line: str) -> bytes:
+    # Marlin line number + XOR checksum, so corrupted lines get a resend.
+    body = f"N{n} {line}".encode()
+    checksum = 0
+    for b in body:
+        checksum ^= b
+    return body + b"*%d\n" % checksum
+
+
+class AsyncPrinterClient:
+    """One printer serial port driven from the event loop.
+
+    A reader task pulls bytes on its own thread and queues complete lines,
+    a SerialWriter sends lines on another, and the event loop only awaits
+    replies.
+    Requests are queued on a DeviceWorker so each runs start to finish.
+    """
+
+    def __init__(self, port: str):
+        self.port = port
+        self.ser: Optional[serial.Serial] = None
+        self.error: Optional[Exception] = None
+        self.lines: asyncio.Queue = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[SerialWriter] = None
+        self._worker = DeviceWorker()
+        self._reader_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="printer-reader")
+        self._reader_task: Optional[asyncio.Task] = None
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        # The reader notices the closed port and stops on its own.
+        if self._writer is not None:
+            self._writer.close()
+        if self.ser is not None:
+            self.ser.close()
+
+    async def send(self, gcode: str, baud: int, timeout_s: float, wait_for_move: bool):
+        """Send G-code; returns (responses, move_completed)."""
+        return await self._worker.submit(self._send, gcode, baud, timeout_s, wait_for_move)
+
+    async def _send(self, gcode: str, baud: int, timeout_s: float, wait_for_move: bool):
+        await self._ensure_open(baud)
+        # Drop any startup chatter or stale replies.
+        while not self.lines.empty():
+            self.lines.get_nowait()
+        try:
+            responses = await self._send_gcode(gcode, timeout_s)
+            move_completed = None
+            if wait_for_move:
+                move_completed = await self._wait_for_move_complete(timeout_s, responses)
+        except serial.SerialException:
+            # Close the port before the next queued request runs so that it
+            # reopens instead of failing on the same dead port.
+            self.close()
+            raise
+        return responses, move_completed
+
+    def _open_blocking(self, baud: int) -> serial.Serial:
         ser = serial.Serial(
-            port=port,
+            port=self.port,
             baudrate=baud,
-            timeout=timeout_s,
-            write_timeout=timeout_s,
+            timeout=PRINTER_READ_POLL_S,
+            write_timeout=PRINTER_WRITE_TIMEOUT_S,
         )
-    except serial.SerialException as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to open printer port {port}: {exc}")
-    return ser
-
-
-def _read_until_ok(ser: serial.Serial, deadline: float, out_lines: List[str]) -> bool:
-    while time.monotonic() < deadline:
-        line = ser.readline()
-        if not line:
-            continue
-        text = line.decode(errors="replace").strip()
-        if text:
-            out_lines.append(text)
-        lower = text.lower()
-        if lower.startswith("ok") or lower.startswith("error"):
-            return True
-    return False
-
-
-def _send_gcode(ser: serial.Serial, gcode: str, timeout_s: float) -> List[str]:
-    lines = [ln.strip() for ln in gcode.splitlines() if ln.strip()]
-    responses: List[str] = []
-    for line in lines:
-        ser.write((line + "\n").encode())
-        ser.flush()
-        _read_until_ok(ser, time.monotonic() + timeout_s, responses)
-    return responses
-
-
-def _wait_for_move_complete(ser: serial.Serial, timeout_s: float, responses: List[str]) -> bool:
-    # M400 waits for all moves to finish in Marlin.
-    ser.write(b"M400\n")
-    ser.flush()
-    return _read_until_ok(ser, time.monotonic() + timeout_s, responses)
+        _set_low_latency(ser)
+        # pyserial already puts POSIX ports in raw mode; on Windows the driver
+        # buffer is small by default, so enlarge it.
+        if hasattr(ser, "set_buffer_size"):
+            ser.set_buffer_size(rx_size=64 * 1024)
+        return ser
+
+    async def _ensure_open(self, baud: int) -> None:
+        loop = asyncio.get_running_loop()
+        # The reader task and line queue belong to the loop that opened the
+        # port; on a new loop, reopen so they are rebuilt on this one.
+        if (self.ser is not None and self.ser.is_open and self.error is None
+                and self._writer is not None and self._writer.error is None
+                and self._loop is loop):
+            if self.ser.baudrate != baud:
+                self.ser.baudrate = baud
+            return
+        self.close()
+        try:
+            self.ser = await loop.run_in_executor(printer_pool, self._open_blocking, baud)
+        except serial.SerialException as exc:
+            raise HTTPException(status_code=500, detail=f"Failed to open printer port {self.port}: {exc}")
+        self.error = None
+        self.lines = asyncio.Queue()
+        self._loop = loop
+        self._writer = SerialWriter(self.ser)
+        self._reader_task = loop.create_task(self._read_loop(self.ser, self.lines))
+
+    def _read_chunk(self, ser: serial.Serial, sel: Optional[selectors.BaseSelector]) -> bytes:
+        if sel is None:
+            # Windows serial handles can't be selected on; read whatever has
+            # arrived in one call (readline() can fall back to a syscall per byte).
+            return ser.read(ser.in_waiting or 1)
+        # Sleep in the kernel until bytes arrive, then take them all at once.
+        # Closing the fd silently drops it from the selector, so check first.
+        if not ser.is_open:
+            raise serial.SerialException("printer port closed")
+        if not sel.select(timeout=PRINTER_READ_POLL_S):
+            return b""
+        try:
+            data = os.read(ser.fileno(), 4096)
+        except BlockingIOError:
+            return b""
+        if not data:
+            # Readable but empty means the device went away.
+            raise serial.SerialException("printer disconnected")
+        return data
+
+    async def _read_loop(self, ser: serial.Serial, lines: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        buf = bytearray()
+        sel = None
+        if os.name == "posix":
+            sel = selectors.DefaultSelector()
+            sel.register(ser.fileno(), selectors.EVENT_READ)
+        try:
+            while True:
+                buf.extend(await loop.run_in_executor(self._reader_pool, self._read_chunk, ser, sel))
+                i = buf.find(b"\n")
+                while i != -1:
+                    line = bytes(buf[:i]).strip()
+                    del buf[:i + 1]
+                    if line:
+                        lines.put_nowait(line)
+                    i = buf.find(b"\n")
+        except Exception as exc:  # port closed or unplugged
+            if ser is self.ser:
+                self.error = exc
+            lines.put_nowait(None)  # wake any waiter
+        finally:
+            if sel is not None:
+                sel.close()
+
+    def _write(self, data: bytes) -> None:
+        self._writer.write(data)
+
+    async def _next_line(self, deadline: float) -> Optional[bytes]:
+        if self._writer.error is not None:
+            # A failed write never gets a reply; don't count it as a timeout.
+            raise serial.SerialException(f"printer write failed: {self._writer.error}")
+        if self.lines.empty():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                line = await asyncio.wait_for(self.lines.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+        else:
+            line = self.lines.get_nowait()
+        if line is None:
+            raise serial.SerialException(f"printer read failed: {self.error}")
+        return line
+
+    async def _read_until_ok(self, deadline: float, out_lines: List[str]) -> bool:
+        while True:
+            line = await self._next_line(deadline)
+            if line is None:
+                return False
+            out_lines.append(line.decode(errors="replace"))
+            if line.lower().startswith(_ACK_PREFIXES):
+                return True
+
+    async def _send_gcode(self, gcode: str, timeout_s: float) -> List[str]:
+        # Comments are dropped so they don't end up inside the checksum.
+        lines = [ln.split(";", 1)[0].strip() for ln in gcode.splitlines()]
+        lines = [ln for ln in lines if ln]
+        responses: List[str] = []
+        if not lines:
+            return responses
+        # "N0 M110" resets Marlin's line counter, so packets[n] is line number n.
+        packets = [_numbered_line(0, "M110")] + [_numbered_line(n, ln) for n, ln in enumerate(lines, 1)]
+
+        inflight = deque()  # byte counts of lines still waiting for "ok"
+        next_n = 0
+        ignore_resends = 0
+        # Replies the caller didn't ask for are left out of responses: the
+        # "ok" for M110, and the error/resend/"ok" Marlin sends for each
+        # rejected line, so there is still one ack per line sent.
+        hidden_oks = 1
+        deadline = time.monotonic() + timeout_s
+        while next_n < len(packets) or inflight:
+            while (next_n < len(packets) and len(inflight) < MAX_INFLIGHT
+                   and (not inflight or sum(inflight) + len(packets[next_n]) <= PRINTER_RX_BUFFER_BYTES)):
+                self._write(packets[next_n])
+                inflight.append(len(packets[next_n]))
+                next_n += 1
+
+            line = await self._next_line(deadline)
+            if line is None:
+                # Same as the unpipelined loop: give up on this line and move on.
+                inflight.popleft()
+                deadline = time.monotonic() + timeout_s
+                continue
+            lower = line.lower()
+            if lower.startswith(b"ok"):
+                if inflight:
+                    inflight.popleft()
+                deadline = time.monotonic() + timeout_s
+                if hidden_oks:
+                    hidden_oks -= 1
+                    continue
+            elif lower.startswith(_RESEND_PREFIXES):
+                hidden_oks += 1
+                digits = "".join(ch for ch in line.decode(errors="replace") if ch.isdigit())
+                if ignore_resends:
+                    ignore_resends -= 1
+                elif digits and int(digits) < next_n:
+                    # Each line already sent after the bad one is rejected with
+                    # its own resend request for the same line; skip those.
+                    ignore_resends = next_n - int(digits) - 1
+                    next_n = int(digits)
+                continue
+            elif lower.startswith(b"error"):
+                if b"last line" in lower:
+                    continue
+                # Errors other than line/checksum ones aren't followed by "ok".
+                if inflight:
+                    inflight.popleft()
+            responses.append(line.decode(errors="replace"))
+        return responses
+
+    async def _wait_for_move_complete(self, timeout_s: float, responses: List[str]) -> bool:
+        # Everything queued must be on the wire before M400 means anything.
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(printer_pool, self._writer.drain, timeout_s):
+            return False
+        # M400 waits for all moves to finish in Marlin.
+        self._write(b"M400\n")
+        return await self._read_until_ok(time.monotonic() + timeout_s, responses)
+
+
+class SerialWriter:
+    """Writes queued bytes to a serial port on a background thread.
+
+    write() returns as soon as the bytes are queued. Nothing waits for the
+    UART until drain(), so sending a line doesn't block on the previous one
+    leaving the wire.
+    """
+
+    def __init__(self, ser: serial.Serial):
+        self.ser = ser
+        self.error: Optional[Exception] = None
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = 0
+        self._drained = threading.Condition()
+        threading.Thread(target=self._run, name="printer-writer", daemon=True).start()
+
+    def write(self, data: bytes) -> None:
+        with self._drained:
+            if self.error is not None:
+                raise serial.SerialException(f"printer write failed: {self.error}")
+            self._pending += 1
+        self._queue.put(data)
+
+    def close(self) -> None:
+        self._queue.put(None)
+
+    def drain(self, timeout_s: float) -> bool:
+        """Block until every queued write is out; False on timeout."""
+        with self._drained:
+            if not self._drained.wait_for(lambda: self._pending == 0 or self.error is not None, timeout_s):
+                return False
+            if self.error is not None:
+                raise serial.SerialException(f"printer write failed: {self.error}")
+        # tcdrain(): wait for the OS buffer to reach the wire as well.
+        self.ser.flush()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            try:
+                # ser.write() loops over partial writes and honours
+                # write_timeout, unlike a bare os.write() on the non-blocking fd.
+                self.ser.write(data)
+            except Exception as exc:  # port closed, unplugged or write timeout
+                with self._drained:
+                    self.error = exc
+                    self._drained.notify_all()
+                return
+            with self._drained:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._drained.notify_all()
+
+
+def get_printer(port: str) -> AsyncPrinterClient:
+    client = _printer_clients.get(port)
+    if client is None:
+        client = _printer_clients[port] = AsyncPrinterClient(port)
+    return client
 
 
 # ----- Request/response models -----
@@ -159,6 +666,104 @@ class ServoTorqueResponse(BaseModel):
     torque_enabled: bool
 
 
+# ----- Blocking servo operations (queued on servo_worker) -----
+
+def _do_servo_disable_torque(req: ServoRequest) -> ServoTorqueResponse:
+    with servo_session(req.dev, req.baud, req.dxl_id) as conn:
+        packet, port = conn.packet, conn.port
+        conn.forget_pos(req.dxl_id)
+        comm = dxl_sync_write_1(packet, port, [req.dxl_id], ADDR_TORQUE_ENABLE, 0)
+        if comm != COMM_SUCCESS:
+            raise HTTPException(status_code=500, detail=f"Torque off failed (comm={comm})")
+        val, rcomm, rerr = dxl_read_1(packet, port, req.dxl_id, ADDR_TORQUE_ENABLE)
+        if rcomm != COMM_SUCCESS:
+            raise HTTPException(status_code=500, detail=f"Torque read failed (comm={rcomm}, err={rerr})")
+        if val == 0 and req.dxl_id in conn.move_blocks and conn.move_blocks[req.dxl_id] is None:
+            # Torque is off now, so the indirect mapping can be retried.
+            del conn.move_blocks[req.dxl_id]
+    return ServoTorqueResponse(dxl_id=req.dxl_id, torque_enabled=bool(val))
+
+
+def _position_response(dxl_id: int, pos: int) -> ServoPositionResponse:
+    return ServoPositionResponse(dxl_id=dxl_id, present_position=pos, present_degrees=ticks_to_deg(pos))
+
+
+def _do_servo_read_position(dev: str, baud: int, dxl_id: int) -> ServoPositionResponse:
+    with servo_session(dev, baud, dxl_id) as conn:
+        pos, comm, err = dxl_read_4(conn.packet, conn.port, dxl_id, ADDR_PRESENT_POSITION)
+        if comm != COMM_SUCCESS:
+            raise HTTPException(status_code=500, detail=f"Read failed (comm={comm}, err={err})")
+        cached = conn.last_pos.get(dxl_id)
+        if cached is not None:
+            # Only refreshed once a move has stopped with torque on, so a cache
+            # hit in servo_move never skips turning torque on.
+            conn.last_pos[dxl_id] = (pos, time.monotonic(), cached[2])
+    return _position_response(dxl_id, pos)
+
+
+def _do_servo_move(req: ServoMoveRequest) -> Tuple[Optional[int], int]:
+    """Write the goal; returns (None, generation) to poll with. If the servo
+    is already within tolerance of the goal, returns (cached position, _)."""
+    with servo_session(req.dev, req.baud, req.dxl_id) as conn:
+        packet, port = conn.packet, conn.port
+        cached = conn.last_pos.get(req.dxl_id)
+        if (cached is not None and time.monotonic() - cached[1] < LAST_POS_MAX_AGE_S
+                and abs(req.goal_position - cached[0]) <= req.tolerance_ticks
+                and abs(req.goal_position - cached[2]) <= req.tolerance_ticks
+                and req.velocity is None and req.acceleration is None):
+            return cached[0], conn.pos_gen[req.dxl_id]
+        # Unknown until the move is polled.
+        gen = conn.forget_pos(req.dxl_id)
+        if req.dxl_id not in conn.move_blocks:
+            conn.move_blocks[req.dxl_id] = _map_move_block(packet, port, req.dxl_id)
+        profile = conn.move_blocks[req.dxl_id]
+
+        if profile is not None:
+            # Torque, profile and goal land in one packet, so the servo never
+            # runs with torque on against a stale goal.
+            if req.acceleration is not None:
+                profile[0] = req.acceleration
+            if req.velocity is not None:
+                profile[1] = req.velocity
+            data = list(struct.pack("<BIII", 1, *(v & 0xFFFFFFFF for v in (*profile, req.goal_position))))
+            gsw = GroupSyncWrite(port, packet, ADDR_INDIRECT_DATA_1, len(data))
+            gsw.addParam(req.dxl_id, data)
+            comm = gsw.txPacket()
+        else:
+            dxl_sync_write_1(packet, port, [req.dxl_id], ADDR_TORQUE_ENABLE, 1)
+            # Profile acceleration, profile velocity and goal position are
+            # contiguous (108..119), so send the profile settings along with
+            # the goal in one packet. Acceleration alone can't share it.
+            addr, values = ADDR_GOAL_POSITION, [req.goal_position]
+            if req.velocity is not None:
+                addr, values = ADDR_PROFILE_VELOCITY, [req.velocity] + values
+                if req.acceleration is not None:
+                    addr, values = ADDR_PROFILE_ACCELERATION, [req.acceleration] + values
+            elif req.acceleration is not None:
+                dxl_sync_write_4(packet, port, [req.dxl_id], ADDR_PROFILE_ACCELERATION, [req.acceleration])
+            comm = dxl_sync_write_4(packet, port, [req.dxl_id], addr, values)
+        if comm != COMM_SUCCESS:
+            raise HTTPException(status_code=500, detail=f"Goal write failed (comm={comm})")
+
+        # Writes get no status packet, so confirm torque by reading it back.
+        val, comm, err = dxl_read_1(packet, port, req.dxl_id, ADDR_TORQUE_ENABLE)
+        if comm != COMM_SUCCESS or val != 1:
+            raise HTTPException(status_code=500, detail=f"Torque on failed (comm={comm}, err={err})")
+    return None, gen
+
+
+def _do_servo_poll_move(req: ServoMoveRequest, gen: int):
+    with servo_session(req.dev, req.baud, req.dxl_id) as conn:
+        moving, pos, comm, err = dxl_read_moving(conn.packet, conn.port, req.dxl_id)
+        if comm != COMM_SUCCESS:
+            raise HTTPException(status_code=500, detail=f"Read failed (comm={comm}, err={err})")
+        # A servo still moving (timed-out or abandoned wait) is headed for the
+        # old goal, so only a stopped one is worth caching.
+        if not moving and conn.pos_gen.get(req.dxl_id) == gen:
+            conn.last_pos[req.dxl_id] = (pos, time.monotonic(), req.goal_position)
+    return moving, pos
+
+
 # ----- Printer endpoints -----
 
 @app.get("/printer/ports")
@@ -174,19 +779,12 @@ def list_printer_ports():
 
 
 @app.post("/printer/send_gcode", response_model=SendGcodeResponse)
-def send_gcode(req: SendGcodeRequest):
-    responses: List[str] = []
-    with printer_lock:
-        ser = _open_printer(req.port, req.baud, req.timeout_s)
-        try:
-            # Clear any startup chatter.
-            ser.reset_input_buffer()
-            responses.extend(_send_gcode(ser, req.gcode, req.timeout_s))
-            move_completed = None
-            if req.wait_for_move:
-                move_completed = _wait_for_move_complete(ser, req.timeout_s, responses)
-        finally:
-            ser.close()
+async def send_gcode(req: SendGcodeRequest):
+    client = get_printer(req.port)
+    try:
+        responses, move_completed = await client.send(req.gcode, req.baud, req.timeout_s, req.wait_for_move)
+    except serial.SerialException as exc:
+        raise HTTPException(status_code=500, detail=f"Printer I/O failed on {req.port}: {exc}")
     return SendGcodeResponse(
         port=req.port,
         baud=req.baud,
@@ -198,94 +796,33 @@ def send_gcode(req: SendGcodeRequest):
 # ----- Servo endpoints -----
 
 @app.post("/servo/disable_torque", response_model=ServoTorqueResponse)
-def servo_disable_torque(req: ServoRequest):
-    with servo_lock:
-        port = PortHandler(req.dev)
-        if not port.openPort():
-            raise HTTPException(status_code=500, detail=f"Failed to open {req.dev}")
-        if not port.setBaudRate(req.baud):
-            port.closePort()
-            raise HTTPException(status_code=500, detail=f"Failed to set baud {req.baud}")
-        packet = PacketHandler(2.0)
-        try:
-            comm, err = dxl_write_1(packet, port, req.dxl_id, ADDR_TORQUE_ENABLE, 0)
-            if comm != COMM_SUCCESS:
-                raise HTTPException(status_code=500, detail=f"Torque off failed (comm={comm}, err={err})")
-            val, rcomm, rerr = dxl_read_1(packet, port, req.dxl_id, ADDR_TORQUE_ENABLE)
-            if rcomm != COMM_SUCCESS:
-                raise HTTPException(status_code=500, detail=f"Torque read failed (comm={rcomm}, err={rerr})")
-        finally:
-            port.closePort()
-    return ServoTorqueResponse(dxl_id=req.dxl_id, torque_enabled=bool(val))
+async def servo_disable_torque(req: ServoRequest):
+    return await servo_worker.submit(_do_servo_disable_torque, req)
 
 
 @app.get("/servo/read_position", response_model=ServoPositionResponse)
-def servo_read_position(dev: str = DXL_DEV_DEFAULT, baud: int = DXL_BAUD_DEFAULT, dxl_id: int = DXL_ID_DEFAULT):
-    with servo_lock:
-        port = PortHandler(dev)
-        if not port.openPort():
-            raise HTTPException(status_code=500, detail=f"Failed to open {dev}")
-        if not port.setBaudRate(baud):
-            port.closePort()
-            raise HTTPException(status_code=500, detail=f"Failed to set baud {baud}")
-        packet = PacketHandler(2.0)
-        try:
-            pos, comm, err = dxl_read_4(packet, port, dxl_id, ADDR_PRESENT_POSITION)
-            if comm != COMM_SUCCESS:
-                raise HTTPException(status_code=500, detail=f"Read failed (comm={comm}, err={err})")
-        finally:
-            port.closePort()
-    return ServoPositionResponse(
-        dxl_id=dxl_id,
-        present_position=pos,
-        present_degrees=ticks_to_deg(pos),
-    )
+async def servo_read_position(dev: str = DXL_DEV_DEFAULT, baud: int = DXL_BAUD_DEFAULT, dxl_id: int = DXL_ID_DEFAULT):
+    return await servo_worker.submit(_do_servo_read_position, dev, baud, dxl_id)
 
 
 @app.post("/servo/move", response_model=ServoPositionResponse)
-def servo_move(req: ServoMoveRequest):
-    with servo_lock:
-        port = PortHandler(req.dev)
-        if not port.openPort():
-            raise HTTPException(status_code=500, detail=f"Failed to open {req.dev}")
-        if not port.setBaudRate(req.baud):
-            port.closePort()
-            raise HTTPException(status_code=500, detail=f"Failed to set baud {req.baud}")
-        packet = PacketHandler(2.0)
-        try:
-            # Best-effort gentle profile settings.
-            if req.acceleration is not None:
-                dxl_write_4(packet, port, req.dxl_id, ADDR_PROFILE_ACCELERATION, req.acceleration)
-            if req.velocity is not None:
-                dxl_write_4(packet, port, req.dxl_id, ADDR_PROFILE_VELOCITY, req.velocity)
-
-            # Enable torque for motion.
-            comm, err = dxl_write_1(packet, port, req.dxl_id, ADDR_TORQUE_ENABLE, 1)
-            if comm != COMM_SUCCESS:
-                raise HTTPException(status_code=500, detail=f"Torque on failed (comm={comm}, err={err})")
-
-            comm, err = dxl_write_4(packet, port, req.dxl_id, ADDR_GOAL_POSITION, req.goal_position)
-            if comm != COMM_SUCCESS:
-                raise HTTPException(status_code=500, detail=f"Goal write failed (comm={comm}, err={err})")
-
-            pos = req.goal_position
-            if req.wait:
-                deadline = time.monotonic() + req.wait_timeout_s
-                while time.monotonic() < deadline:
-                    pos, rcomm, rerr = dxl_read_4(packet, port, req.dxl_id, ADDR_PRESENT_POSITION)
-                    if rcomm != COMM_SUCCESS:
-                        raise HTTPException(status_code=500, detail=f"Read failed (comm={rcomm}, err={rerr})")
-                    if abs(pos - req.goal_position) <= req.tolerance_ticks:
-                        break
-                    time.sleep(0.05)
-        finally:
-            port.closePort()
-
-    return ServoPositionResponse(
-        dxl_id=req.dxl_id,
-        present_position=pos,
-        present_degrees=ticks_to_deg(pos),
-    )
+async def servo_move(req: ServoMoveRequest):
+    cached, gen = await servo_worker.submit(_do_servo_move, req)
+    if cached is not None:
+        return _position_response(req.dxl_id, cached)
+    pos = req.goal_position
+    if req.wait:
+        # Each poll is its own queued op, so other servo requests run between
+        # polls instead of waiting out the whole move, and a cancelled wait
+        # never leaves the bus mid-transaction.
+        deadline = time.monotonic() + req.wait_timeout_s
+        while time.monotonic() < deadline:
+            moving, pos = await servo_worker.submit(_do_servo_poll_move, req, gen)
+            # The servo clears Moving once its profile has finished.
+            if not moving or abs(pos - req.goal_position) <= req.tolerance_ticks:
+                break
+            await asyncio.sleep(0.005)
+    return _position_response(req.dxl_id, pos)
 
 
 if __name__ == "__main__":
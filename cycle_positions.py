@@ -2,9 +2,10 @@
 """Cycle a Dynamixel between two goal positions until interrupted."""
 
 import argparse
+import struct
 import time
 
-from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS
+from dynamixel_sdk import PortHandler, PacketHandler, GroupSyncWrite, COMM_SUCCESS, COMM_TX_FAIL
 
 # Default connection settings (match wiggle.py)
 DEV = "/dev/ttyACM0"
@@ -12,13 +13,42 @@ BAUD = 1_000_000
 DXL_ID = 1
 
 # Control table addresses (Protocol 2.0, X-series/XL330-style defaults)
+ADDR_DRIVE_MODE = 10
 ADDR_TORQUE_ENABLE = 64
+ADDR_STATUS_RETURN_LEVEL = 68
 ADDR_PROFILE_ACCELERATION = 108
 ADDR_PROFILE_VELOCITY = 112
 ADDR_GOAL_POSITION = 116
 
+# Drive Mode bit 2: profile velocity/acceleration are times in ms.
+DRIVE_MODE_TIME_BASED = 0x04
 
-def dxl_write_1(packet, port, dxl_id, addr, value):
+INST_WRITE = 0x03
+
+
+def _make_crc_table():
+    # Protocol 2.0 CRC-16 (polynomial 0x8005), same as the SDK's updateCRC.
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x8005 if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc16(crc, data):
+    for b in data:
+        crc = ((crc << 8) ^ _CRC_TABLE[((crc >> 8) ^ b) & 0xFF]) & 0xFFFF
+    return crc
+
+
+def dxl_write_1(packet, port, dxl_id, addr, value, expect_reply: bool = True):
+    if not expect_reply:
+        return packet.write1ByteTxOnly(port, dxl_id, addr, value), 0
     res = packet.write1ByteTxRx(port, dxl_id, addr, value)
     # Some SDK bindings return (comm, err) instead of (_, comm, err).
     if len(res) == 2:
@@ -28,13 +58,48 @@ def dxl_write_1(packet, port, dxl_id, addr, value):
     return comm, err
 
 
-def dxl_write_4(packet, port, dxl_id, addr, value):
-    res = packet.write4ByteTxRx(port, dxl_id, addr, value)
-    if len(res) == 2:
-        comm, err = res
-    else:
-        _, comm, err = res
-    return comm, err
+def dxl_read_1(packet, port, dxl_id, addr):
+    val, comm, err = packet.read1ByteTxRx(port, dxl_id, addr)
+    return val, comm, err
+
+
+def dxl_sync_write_4(packet, port, ids, addr, values):
+    # Consecutive 4-byte registers from addr, same values for every ID, one packet.
+    data = list(struct.pack(f"<{len(values)}I", *(v & 0xFFFFFFFF for v in values)))
+    gsw = GroupSyncWrite(port, packet, addr, len(data))
+    for dxl_id in ids:
+        gsw.addParam(dxl_id, data)
+    return gsw.txPacket()
+
+
+class FastWriter:
+    """Fire-and-forget 4-byte writes to one register of one servo.
+
+    Header, ID, length, instruction and address never change, so the packet
+    and the CRC over that prefix are built once; each write only fills in
+    the 4 data bytes and folds them into the CRC.
+    """
+
+    def __init__(self, packet, port, dxl_id, addr):
+        self.packet = packet
+        self.port = port
+        self.dxl_id = dxl_id
+        self.addr = addr
+        # FF FF FD 00 | ID | LEN=9 (inst + addr + 4 data + crc) | WRITE | addr | data | crc
+        self.template = bytearray([0xFF, 0xFF, 0xFD, 0x00, dxl_id, 9, 0, INST_WRITE, addr & 0xFF, addr >> 8]) + bytes(6)
+        self.prefix_crc = crc16(0, self.template[:10])
+
+    def write(self, value):
+        data = (value & 0xFFFFFFFF).to_bytes(4, "little")
+        pkt = self.template
+        pkt[10:14] = data
+        if b"\xff\xff\xfd" in pkt[7:14]:
+            # Needs byte stuffing; rare enough to leave to the SDK.
+            return self.packet.write4ByteTxOnly(self.port, self.dxl_id, self.addr, value)
+        crc = crc16(self.prefix_crc, data)
+        pkt[14] = crc & 0xFF
+        pkt[15] = crc >> 8
+        return COMM_SUCCESS if self.port.writePort(pkt) == len(pkt) else COMM_TX_FAIL
 
 
 def main() -> int:
@@ -47,6 +112,9 @@ def main() -> int:
     parser.add_argument("--wait", type=float, default=1.0, help="Seconds to wait at each position")
     parser.add_argument("--velocity", type=int, default=20, help="Profile velocity (optional)")
     parser.add_argument("--accel", type=int, default=5, help="Profile acceleration (optional)")
+    parser.add_argument("--move-ms", type=int, default=None,
+                        help="Use a time-based profile: each move takes this many ms "
+                             "(overrides --velocity/--accel; drive mode is restored on exit)")
     args = parser.parse_args()
 
     port = PortHandler(args.dev)
@@ -60,30 +128,65 @@ def main() -> int:
 
     packet = PacketHandler(2.0)
 
-    # Best-effort gentle profile settings.
-    dxl_write_4(packet, port, args.id, ADDR_PROFILE_ACCELERATION, args.accel)
-    dxl_write_4(packet, port, args.id, ADDR_PROFILE_VELOCITY, args.velocity)
+    # Make sure writes are acknowledged (api_server.py turns that off) so the
+    # torque-on result below is meaningful.
+    dxl_write_1(packet, port, args.id, ADDR_STATUS_RETURN_LEVEL, 2)
 
-    # Enable torque for motion.
-    comm, err = dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 1)
-    if comm != COMM_SUCCESS:
-        print(f"ID {args.id}: torque on failed (comm={comm}, err={err})")
-        port.closePort()
-        return 1
+    # Time-based profile: the servo times each move itself, so the loop below
+    # only has to hand it the next goal. Drive Mode is EEPROM and can only be
+    # written with torque off.
+    drive_mode = None
+    if args.move_ms is not None:
+        dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 0)
+        mode, comm, err = dxl_read_1(packet, port, args.id, ADDR_DRIVE_MODE)
+        if comm != COMM_SUCCESS:
+            print(f"ID {args.id}: drive mode read failed (comm={comm}, err={err})")
+            port.closePort()
+            return 1
+        if not mode & DRIVE_MODE_TIME_BASED:
+            comm, err = dxl_write_1(packet, port, args.id, ADDR_DRIVE_MODE, mode | DRIVE_MODE_TIME_BASED)
+            if comm != COMM_SUCCESS:
+                print(f"ID {args.id}: drive mode write failed (comm={comm}, err={err})")
+                port.closePort()
+                return 1
+            drive_mode = mode
+        # Ramp up/down over a quarter of the move each.
+        profile = [args.move_ms // 4, args.move_ms]
+    else:
+        profile = [args.accel, args.velocity]
+
+    # Best-effort gentle profile settings (acceleration + velocity in one packet).
+    dxl_sync_write_4(packet, port, [args.id], ADDR_PROFILE_ACCELERATION, profile)
 
     positions = [args.pos_a, args.pos_b]
     idx = 0
     try:
+        # Enable torque for motion.
+        comm, err = dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 1)
+        if comm != COMM_SUCCESS:
+            print(f"ID {args.id}: torque on failed (comm={comm}, err={err})")
+            return 1
+
+        # Reply to reads only while cycling; goal writes are fire-and-forget.
+        dxl_write_1(packet, port, args.id, ADDR_STATUS_RETURN_LEVEL, 1)
+
         print("Cycling positions. Press Ctrl-C to stop.")
+        # Schedule against absolute times so write latency doesn't add drift.
+        goal_writer = FastWriter(packet, port, args.id, ADDR_GOAL_POSITION)
+        next_t = time.perf_counter()
         while True:
             goal = positions[idx % 2]
-            dxl_write_4(packet, port, args.id, ADDR_GOAL_POSITION, goal)
-            time.sleep(args.wait)
+            goal_writer.write(goal)
             idx += 1
+            next_t += args.wait
+            time.sleep(max(0.0, next_t - time.perf_counter()))
     except KeyboardInterrupt:
         print("\nStopping. Disabling torque...")
     finally:
-        dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 0)
+        dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 0, expect_reply=False)
+        if drive_mode is not None:
+            dxl_write_1(packet, port, args.id, ADDR_DRIVE_MODE, drive_mode, expect_reply=False)
+        dxl_write_1(packet, port, args.id, ADDR_STATUS_RETURN_LEVEL, 2)
         port.closePort()
 
     return 0
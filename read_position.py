@@ -17,10 +17,12 @@ ADDR_PRESENT_POSITION = 132
 # Position units: assume 0..4095 maps to 0..360 degrees (adjust if needed)
 TICKS_PER_REV = 4096
 DEGREES_PER_REV = 360.0
+_TICK_MASK = TICKS_PER_REV - 1  # TICKS_PER_REV is a power of two
+_DEG_PER_TICK = DEGREES_PER_REV / TICKS_PER_REV
 
 
 def ticks_to_deg(ticks: int) -> float:
-    return (ticks % TICKS_PER_REV) * (DEGREES_PER_REV / TICKS_PER_REV)
+    return (ticks & _TICK_MASK) * _DEG_PER_TICK
 
 
 def dxl_write_1(packet, port, dxl_id, addr, value):
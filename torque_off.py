@@ -12,6 +12,7 @@ DXL_ID = 1
 
 # Control table addresses (Protocol 2.0, X-series/XL330-style defaults)
 ADDR_TORQUE_ENABLE = 64
+ADDR_STATUS_RETURN_LEVEL = 68
 
 
 def dxl_write_1(packet, port, dxl_id, addr, value):
@@ -47,6 +48,10 @@ def main() -> int:
 
     packet = PacketHandler(2.0)
 
+    # api_server.py lowers Status Return Level so writes aren't acknowledged;
+    # restore replies so the write results below can be checked.
+    dxl_write_1(packet, port, args.id, ADDR_STATUS_RETURN_LEVEL, 2)
+
     comm, err = dxl_write_1(packet, port, args.id, ADDR_TORQUE_ENABLE, 0)
     if comm != COMM_SUCCESS:
         print(f"ID {args.id}: torque off write failed (comm={comm}, err={err})")
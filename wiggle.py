@@ -9,10 +9,11 @@ No motion occurs until you type YES at the prompt.
 """
 
 import math
+import struct
 import sys
 import time
 
-from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS
+from dynamixel_sdk import PortHandler, PacketHandler, GroupSyncRead, GroupSyncWrite, COMM_SUCCESS
 
 # --- User-tunable settings ---
 DEV = "/dev/ttyACM0"
@@ -21,6 +22,7 @@ IDS = [1, 2]
 
 # Control table addresses (Protocol 2.0, X-series/XL330-style defaults)
 ADDR_TORQUE_ENABLE = 64
+ADDR_STATUS_RETURN_LEVEL = 68
 ADDR_OPERATING_MODE = 11
 ADDR_PROFILE_ACCELERATION = 108
 ADDR_PROFILE_VELOCITY = 112
@@ -30,6 +32,9 @@ ADDR_PRESENT_POSITION = 132
 # Position units: assume 0..4095 maps to 0..360 degrees (adjust if needed)
 TICKS_PER_REV = 4096
 DEGREES_PER_REV = 360.0
+_TICK_MASK = TICKS_PER_REV - 1  # TICKS_PER_REV is a power of two
+_DEG_PER_TICK = DEGREES_PER_REV / TICKS_PER_REV
+_TICKS_PER_DEG = TICKS_PER_REV / DEGREES_PER_REV
 
 # Motion settings
 DELTA_DEG = 10.0
@@ -40,11 +45,11 @@ MOVE_SETTLE_S = 0.6
 # --- Helpers ---
 
 def ticks_to_deg(ticks: int) -> float:
-    return (ticks % TICKS_PER_REV) * (DEGREES_PER_REV / TICKS_PER_REV)
+    return (ticks & _TICK_MASK) * _DEG_PER_TICK
 
 
 def deg_to_ticks(deg: float) -> int:
-    return int(round((deg / DEGREES_PER_REV) * TICKS_PER_REV))
+    return int(round(deg * _TICKS_PER_DEG))
 
 
 def dxl_write_1(packet, port, dxl_id, addr, value):
@@ -66,14 +71,32 @@ def dxl_write_4(packet, port, dxl_id, addr, value):
     return comm, err
 
 
-def dxl_read_4(packet, port, dxl_id, addr):
-    val, comm, err = packet.read4ByteTxRx(port, dxl_id, addr)
-    return val, comm, err
+def dxl_sync_write_4(packet, port, ids, addr, values):
+    # Consecutive 4-byte registers from addr, same values for every ID, one packet.
+    data = list(struct.pack(f"<{len(values)}I", *(v & 0xFFFFFFFF for v in values)))
+    gsw = GroupSyncWrite(port, packet, addr, len(data))
+    for dxl_id in ids:
+        gsw.addParam(dxl_id, data)
+    return gsw.txPacket()
 
 
-def dxl_read_1(packet, port, dxl_id, addr):
-    val, comm, err = packet.read1ByteTxRx(port, dxl_id, addr)
-    return val, comm, err
+def sync_read(packet, port, ids, addr, size):
+    """Read one register from every ID in a single instruction.
+
+    Returns {id: value} for the IDs that answered. One silent ID fails the
+    whole sync read, so in that case the rest are read individually.
+    """
+    gsr = GroupSyncRead(port, packet, addr, size)
+    for dxl_id in ids:
+        gsr.addParam(dxl_id)
+    if gsr.txRxPacket() == COMM_SUCCESS:
+        return {dxl_id: gsr.getData(dxl_id, addr, size) for dxl_id in ids}
+    results = {}
+    for dxl_id in ids:
+        data, comm, _ = packet.readTxRx(port, dxl_id, addr, size)
+        if comm == COMM_SUCCESS:
+            results[dxl_id] = int.from_bytes(bytes(data), "little")
+    return results
 
 
 def main() -> int:
@@ -88,18 +111,18 @@ def main() -> int:
 
     packet = PacketHandler(2.0)
 
-    print("Connected. Reading positions...")
-    positions = {}
-    modes = {}
+    # api_server.py lowers Status Return Level so writes aren't acknowledged;
+    # restore replies so the write results below can be checked.
     for dxl_id in IDS:
-        pos, comm, err = dxl_read_4(packet, port, dxl_id, ADDR_PRESENT_POSITION)
-        if comm != COMM_SUCCESS:
-            print(f"ID {dxl_id}: read failed (comm={comm}, err={err})")
-            continue
-        positions[dxl_id] = pos
-        mode, mcomm, merr = dxl_read_1(packet, port, dxl_id, ADDR_OPERATING_MODE)
-        if mcomm == COMM_SUCCESS:
-            modes[dxl_id] = mode
+        dxl_write_1(packet, port, dxl_id, ADDR_STATUS_RETURN_LEVEL, 2)
+
+    print("Connected. Reading positions...")
+    positions = sync_read(packet, port, IDS, ADDR_PRESENT_POSITION, 4)
+    modes = sync_read(packet, port, list(positions), ADDR_OPERATING_MODE, 1)
+    missing = [dxl_id for dxl_id in IDS if dxl_id not in positions]
+    if missing:
+        print(f"IDs {missing}: read failed")
+    for dxl_id, pos in positions.items():
         print(f"ID {dxl_id}: present_position={pos} ({ticks_to_deg(pos):.1f} deg)")
 
     if not positions:
@@ -125,17 +148,19 @@ def main() -> int:
             port.closePort()
             return 0
 
+    # Ensure torque is off before configuration
+    for dxl_id in positions:
+        dxl_write_1(packet, port, dxl_id, ADDR_TORQUE_ENABLE, 0)
+
+    # Try to set gentle profile values for every servo in one packet
+    # (ignore errors; some models may not support)
+    dxl_sync_write_4(packet, port, list(positions), ADDR_PROFILE_ACCELERATION,
+                     [PROFILE_ACCELERATION, PROFILE_VELOCITY])
+
     for dxl_id in IDS:
         if dxl_id not in positions:
             continue
 
-        # Ensure torque is off before configuration
-        dxl_write_1(packet, port, dxl_id, ADDR_TORQUE_ENABLE, 0)
-
-        # Try to set gentle profile values (ignore errors; some models may not support)
-        dxl_write_4(packet, port, dxl_id, ADDR_PROFILE_ACCELERATION, PROFILE_ACCELERATION)
-        dxl_write_4(packet, port, dxl_id, ADDR_PROFILE_VELOCITY, PROFILE_VELOCITY)
-
         # Enable torque
         dxl_write_1(packet, port, dxl_id, ADDR_TORQUE_ENABLE, 1)
 